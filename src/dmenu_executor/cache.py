@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+from pathlib import Path
+import os
+
+
+def cache_dir() -> Path:
+    _cache = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(_cache) / "dmenu_executor"
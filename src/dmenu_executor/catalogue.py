@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+from pathlib import Path
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+from dmenu_executor.cache import cache_dir
+from dmenu_executor.entry import EntryOpenPdf
+from dmenu_executor.menu import Dmenu, show_buffer
+from dmenu_executor.settings import Settings
+
+_MAGIC = b"DMXC"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHQ")
+_OFFSET = struct.Struct("<Q")
+_ENCODING = "utf-8"
+_ERRORS = "surrogateescape"
+
+
+class CatalogueError(ValueError):
+    pass
+
+
+def catalogue_path_for(search_paths: list[str]) -> Path:
+    """
+    Catalogue file shared by every process scanning the same search paths.
+    """
+    _key = "\n".join(sorted(str(Path(p).expanduser()) for p in search_paths))
+    _digest = hashlib.sha1(_key.encode(_ENCODING, _ERRORS)).hexdigest()
+    return cache_dir() / f"pdf-{_digest}.cat"
+
+
+def _unique_labels(records: list[tuple[str, str]]) -> list[tuple[bytes, bytes]]:
+    """
+    Encode and sort records by label, duplicate labels get a " (n)" suffix so
+    every label resolves to exactly one path.
+    """
+    _records = sorted((label.replace("\n", " "), pdf_path)
+                      for label, pdf_path in records)
+    _seen: set[str] = set()
+    _unique = []
+    for label, pdf_path in _records:
+        _label, _num = label, 1
+        while _label in _seen:
+            _num += 1
+            _label = f"{label} ({_num})"
+        _seen.add(_label)
+        _unique.append((_label.encode(_ENCODING, _ERRORS),
+                        pdf_path.encode(_ENCODING, _ERRORS)))
+    return sorted(_unique)
+
+
+class PdfCatalogue:
+    """
+    Read-only, memory-mapped catalogue of (label, pdf path) records sorted by
+    label, labels are unique.
+
+    Layout (little-endian):
+        header:  magic "DMXC", u16 version, u16 reserved, u64 record count (N)
+        table:   N + 1 u64 label offsets, N + 1 u64 path offsets
+        blob:    UTF-8 labels, each terminated by "\\n", followed by UTF-8 paths
+
+    Offsets are absolute file positions, label i spans
+    [label_offset(i), label_offset(i + 1) - 1), so the label region is a
+    ready-made dmenu stdin buffer.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as _file:
+            self._mm = mmap.mmap(_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._validate()
+        except CatalogueError:
+            self.close()
+            raise
+
+    def _validate(self) -> None:
+        if len(self._mm) < _HEADER.size:
+            raise CatalogueError(f"truncated catalogue: {self.path}")
+        _magic, _version, _, self._count = _HEADER.unpack_from(self._mm, 0)
+        if _magic != _MAGIC or _version != _VERSION:
+            raise CatalogueError(f"unsupported catalogue: {self.path}")
+        self._label_table = _HEADER.size
+        self._path_table = self._label_table + (self._count + 1) * _OFFSET.size
+        _blob = self._path_table + (self._count + 1) * _OFFSET.size
+        if len(self._mm) < _blob:
+            raise CatalogueError(f"truncated catalogue: {self.path}")
+        if (self._offset(self._label_table, 0) != _blob
+                or self._offset(self._label_table, self._count)
+                != self._offset(self._path_table, 0)
+                or self._offset(self._path_table, self._count) != len(self._mm)):
+            raise CatalogueError(f"corrupt catalogue: {self.path}")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self) -> PdfCatalogue:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _offset(self, table: int, index: int) -> int:
+        return _OFFSET.unpack_from(self._mm, table + index * _OFFSET.size)[0]
+
+    def _label_bytes(self, index: int) -> bytes:
+        return self._mm[self._offset(self._label_table, index):
+                        self._offset(self._label_table, index + 1) - 1]
+
+    def label(self, index: int) -> str:
+        return self._label_bytes(index).decode(_ENCODING, _ERRORS)
+
+    def pdf_path(self, index: int) -> Path:
+        return Path(self._mm[self._offset(self._path_table, index):
+                             self._offset(self._path_table, index + 1)]
+                    .decode(_ENCODING, _ERRORS))
+
+    def labels_buffer(self) -> memoryview:
+        return memoryview(self._mm)[self._offset(self._label_table, 0):
+                                    self._offset(self._label_table, self._count)]
+
+    def find(self, label: str) -> int | None:
+        _key = label.encode(_ENCODING, _ERRORS)
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if self._label_bytes(mid) < _key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self._count and self._label_bytes(low) == _key:
+            return low
+        return None
+
+    def close(self) -> None:
+        self._mm.close()
+
+    @staticmethod
+    def write(path: Path, records: list[tuple[str, str]]) -> None:
+        """
+        Write records atomically, processes still mapping an older catalogue
+        at the same path keep their (unlinked) copy.
+        """
+        _records = _unique_labels(records)
+        _count = len(_records)
+        _pos = _HEADER.size + 2 * (_count + 1) * _OFFSET.size
+        label_offsets = []
+        for label, _ in _records:
+            label_offsets.append(_pos)
+            _pos += len(label) + 1
+        label_offsets.append(_pos)
+        path_offsets = []
+        for _, pdf_path in _records:
+            path_offsets.append(_pos)
+            _pos += len(pdf_path)
+        path_offsets.append(_pos)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _fd, _tmp = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.")
+        try:
+            with os.fdopen(_fd, "wb") as _file:
+                _file.write(_HEADER.pack(_MAGIC, _VERSION, 0, _count))
+                for offset in label_offsets + path_offsets:
+                    _file.write(_OFFSET.pack(offset))
+                for label, _ in _records:
+                    _file.write(label + b"\n")
+                for _, pdf_path in _records:
+                    _file.write(pdf_path)
+            os.replace(_tmp, path)
+        except BaseException:
+            Path(_tmp).unlink(missing_ok=True)
+            raise
+
+    @classmethod
+    def open_fresh(cls, search_paths: list[str], max_age: float) -> PdfCatalogue | None:
+        """
+        Map the shared catalogue for search_paths if it exists, is readable and
+        is at most max_age seconds old.
+        """
+        path = catalogue_path_for(search_paths)
+        try:
+            if time.time() - path.stat().st_mtime <= max_age:
+                return cls(path)
+            logging.getLogger(cls.__name__).debug(f"stale: {path}")
+        except (OSError, ValueError) as error:
+            logging.getLogger(cls.__name__).debug(f"cannot use {path}: {error}")
+        return None
+
+    @classmethod
+    def build(cls,
+              search_paths: list[str],
+              items: list[tuple[Path, str]]) -> PdfCatalogue | None:
+        """
+        Write the scanned (pdf path, nfo) items as the shared catalogue for
+        search_paths and map it. Returns None if that fails, the caller still
+        has the items.
+        """
+        logger = logging.getLogger(cls.__name__)
+        path = catalogue_path_for(search_paths)
+        records = [(EntryOpenPdf.make_label(item, nfo), str(item))
+                   for item, nfo in items]
+        try:
+            cls.write(path, records)
+            catalogue = cls(path)
+        except (OSError, ValueError) as error:
+            logger.warning(f"could not write {path}: {error}")
+            return None
+        logger.debug(f"wrote {len(records)} records to {path}")
+        return catalogue
+
+
+class PdfCatalogueMenu:
+    def __init__(self,
+                 catalogue: PdfCatalogue,
+                 executable: str,
+                 workspace: str = "",
+                 settings: Settings | None = None):
+        self.settings = settings or Settings()
+        self._catalogue = catalogue
+        self._executable = executable
+        self._workspace = workspace
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+    def prepare(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self._catalogue.close()
+
+    def _select(self) -> Path | None:
+        with self._catalogue:
+            _buffer = self._catalogue.labels_buffer()
+            try:
+                ret = show_buffer(_buffer, self.settings)
+            finally:
+                _buffer.release()
+            if not ret:
+                return None
+            if (index := self._catalogue.find(ret)) is None:
+                raise RuntimeError(f"could not find entry for execution: {ret}")
+            return self._catalogue.pdf_path(index)
+
+    def execute(self) -> None:
+        if (pdf_path := self._select()) is None:
+            return
+        if not pdf_path.exists():
+            self._logger.warning(f"{pdf_path} is missing, invalidating catalogue")
+            self._catalogue.path.unlink(missing_ok=True)
+            Dmenu.create_menu_with_errors(
+                f"file does not exist: {pdf_path}").execute()
+            return
+        entry = EntryOpenPdf(pdf_path=pdf_path,
+                             executable=self._executable,
+                             workspace=self._workspace)
+        entry.settings = self.settings
+        entry.execute()
@@ -2,19 +2,25 @@ from __future__ import annotations
 
 import dataclasses
 import logging
+import os
 from abc import ABC, abstractmethod
 from enum import StrEnum
 from pathlib import Path
+import threading
 import time
 
 import concurrent.futures
-from typing import Union
+from typing import Iterator, Union, TYPE_CHECKING
 
 from i3man.utils import move_workspaces_to_default_monitor
 
 from dmenu_executor.i3.utils import run_exec, select_workspace
 from dmenu_executor.settings import Settings
 
+if TYPE_CHECKING:
+    from dmenu_executor.catalogue import PdfCatalogueMenu
+    from dmenu_executor.menu import Dmenu
+
 WS_LEN = 200
 
 
@@ -60,6 +66,8 @@ class UrlEntry:
 
 
 class Entry(ABC):
+    can_prefetch: bool = False
+
     def __init__(self, text, workspace: str = "", add_workspace_to_label: bool = False):
         if add_workspace_to_label and workspace:
             _suffix = f" | ws: {workspace}"
@@ -79,6 +87,65 @@ class Entry(ABC):
         select_workspace(self._workspace)
         time.sleep(0.1)
 
+    def prefetch(self, executor: concurrent.futures.Executor) -> None:
+        pass
+
+    def cancel_prefetch(self) -> None:
+        pass
+
+
+def _close_prefetched_menu(future: concurrent.futures.Future) -> None:
+    if future.exception() is None:
+        future.result().close()
+
+
+class SubMenuEntry(Entry):
+    can_prefetch = True
+
+    def __init__(self, text, workspace: str = "", add_workspace_to_label: bool = False):
+        self._future: concurrent.futures.Future[Dmenu | PdfCatalogueMenu] | None = None
+        self._cancel = threading.Event()
+        Entry.__init__(self,
+                       text,
+                       workspace=workspace,
+                       add_workspace_to_label=add_workspace_to_label)
+
+    @abstractmethod
+    def _build_menu(self, cancel: threading.Event) -> Dmenu | PdfCatalogueMenu:
+        ...
+
+    def _build_prepared_menu(self, cancel: threading.Event) -> Dmenu | PdfCatalogueMenu:
+        menu = self._build_menu(cancel)
+        menu.prepare()
+        return menu
+
+    def prefetch(self, executor: concurrent.futures.Executor) -> None:
+        if self._future is not None:
+            return
+        self._cancel = threading.Event()
+        self._future = executor.submit(self._build_prepared_menu, self._cancel)
+
+    def cancel_prefetch(self) -> None:
+        if self._future is None:
+            return
+        self._cancel.set()
+        if not self._future.cancel():
+            self._future.add_done_callback(_close_prefetched_menu)
+        self._future = None
+
+    def get_menu(self) -> Dmenu | PdfCatalogueMenu:
+        if self._future is not None:
+            try:
+                return self._future.result()
+            except concurrent.futures.CancelledError:
+                pass
+            finally:
+                self._future = None
+        return self._build_prepared_menu(threading.Event())
+
+    def execute(self) -> None:
+        self.get_menu().execute()
+
 
 class EntryError(Entry):
     def execute(self) -> None:
@@ -197,16 +264,10 @@ class EntryOpenPdf(Entry):
                  workspace: str = "",
                  add_workspace_to_label: bool = False,
                  nfo: str = ""):
-
-        _loc = pdf_path.parent.relative_to(Path.home())
-        if nfo:
-            _label = f"{pdf_path.name} | {_loc} ({nfo})"
-        else:
-            _label = f"{pdf_path.name} | {_loc}"
         self._path = pdf_path
         self._executable = executable
         Entry.__init__(self,
-                       _label,
+                       self.make_label(pdf_path, nfo),
                        workspace=workspace,
                        add_workspace_to_label=add_workspace_to_label)
 
@@ -214,34 +275,51 @@ class EntryOpenPdf(Entry):
         self.select_workspace()
         run_exec(f"{self._executable} \"{self._path}\"")
 
+    @staticmethod
+    def make_label(pdf_path: Path, nfo: str = "") -> str:
+        _loc = pdf_path.parent.relative_to(Path.home())
+        if nfo:
+            return f"{pdf_path.name} | {_loc} ({nfo})"
+        return f"{pdf_path.name} | {_loc}"
+
+    @staticmethod
+    def scan(paths: list[str],
+             cancel: threading.Event | None = None
+             ) -> Iterator[tuple[Path, str]]:
+        logger = logging.getLogger("_pdf_scan")
+        start = time.time()
+        for _path in paths:
+            logger.debug(f"scanning {_path}...")
+            for _dir, _, files in os.walk(_path):
+                if cancel is not None and cancel.is_set():
+                    logger.debug("cancelled")
+                    return
+                for name in files:
+                    if not name.endswith(".pdf"):
+                        continue
+                    item = Path(_dir) / name
+                    nfo_file = item.with_suffix(".nfo")
+                    if nfo_file.is_file():
+                        logger.debug(f"reading: {nfo_file.name}")
+                        text = nfo_file.read_text()
+                        nfo = text.strip("\n")
+                    else:
+                        nfo = ""
+                    yield item, nfo
+        logger.debug(f"operation took {time.time() - start} s")
+
     @classmethod
     def build_entries(cls,
                       paths: list[str],
                       workspace: str,
-                      executable: str
+                      executable: str,
+                      cancel: threading.Event | None = None
                       ) -> list[EntryOpenPdf]:
-        logger = logging.getLogger("_pdf_build_entries")
-        entries: list[EntryOpenPdf] = []
-        start = time.time()
-        for _path in paths:
-            logger.debug(f"globbing {_path}...")
-            items: list[Path] = list(Path(_path).rglob("*.pdf"))
-            logger.debug(f"found {len(items)} matches")
-            for item in items:
-                nfo_file = item.with_suffix(".nfo")
-                if nfo_file.is_file():
-                    logger.debug(f"reading: {nfo_file.name}")
-                    text = nfo_file.read_text()
-                    nfo = text.strip("\n")
-                else:
-                    nfo = ""
-                entry = EntryOpenPdf(pdf_path=item,
-                                     nfo=nfo,
-                                     executable=executable,
-                                     workspace=workspace)
-                entries.append(entry)
-        logger.debug(f"operation took {time.time() - start} s")
-        return entries
+        return [EntryOpenPdf(pdf_path=item,
+                             nfo=nfo,
+                             executable=executable,
+                             workspace=workspace)
+                for item, nfo in EntryOpenPdf.scan(paths, cancel)]
 
 
 class I3CommandEntry(Entry):
@@ -287,35 +365,53 @@ class I3CommandEntry(Entry):
         )
 
 
-class EntryOpenPdfSubMenu(Entry):
+class EntryOpenPdfSubMenu(SubMenuEntry):
     def __init__(self,
                  search_paths: list[str],
                  executable: str,
                  label: str = "",
                  workspace: str = ""):
         self._executable: str = executable
+        self._search_paths = search_paths
+        self._pdf_workspace = workspace
         self._logger = logging.getLogger(self.__class__.__name__)
         self._logger.debug(f"{search_paths=}")
         if label:
             _label = label
         else:
             _label = ", ".join(search_paths)
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            self._future = executor.submit(EntryOpenPdf.build_entries,
-                                           search_paths,
-                                           workspace,
-                                           executable)
-        Entry.__init__(self, f"[pdf] {_label}")
+        SubMenuEntry.__init__(self, f"[pdf] {_label}")
 
-    def execute(self) -> None:
+    def _build_menu(self, cancel: threading.Event) -> Dmenu | PdfCatalogueMenu:
         from dmenu_executor import Dmenu
 
+        items: list[tuple[Path, str]] | None = None
+        if self.settings and self.settings.pdf_catalogue:
+            from dmenu_executor.catalogue import PdfCatalogue, PdfCatalogueMenu
+
+            catalogue = PdfCatalogue.open_fresh(self._search_paths,
+                                                self.settings.pdf_catalogue_max_age)
+            if catalogue is None:
+                items = list(EntryOpenPdf.scan(self._search_paths, cancel))
+                if not cancel.is_set():
+                    catalogue = PdfCatalogue.build(self._search_paths, items)
+            if catalogue is not None:
+                menu = PdfCatalogueMenu(catalogue,
+                                        executable=self._executable,
+                                        workspace=self._pdf_workspace)
+                menu.settings.prompt = f"Open in ({self._executable})"
+                return menu
+
         dmenu = Dmenu()
         dmenu.settings.prompt = f"Open in ({self._executable})"
-        entries: list[EntryOpenPdf] = self._future.result()
-        for entry in entries:
-            dmenu.add_entry(entry)
-        dmenu.execute()
+        if items is None:
+            items = list(EntryOpenPdf.scan(self._search_paths, cancel))
+        for item, nfo in items:
+            dmenu.add_entry(EntryOpenPdf(pdf_path=item,
+                                         nfo=nfo,
+                                         executable=self._executable,
+                                         workspace=self._pdf_workspace))
+        return dmenu
 
     @classmethod
     def from_dict(cls, data: dict) -> EntryOpenPdfSubMenu:
@@ -328,7 +424,7 @@ class EntryOpenPdfSubMenu(Entry):
         )
 
 
-class EntryOpenUrlSubMenu(Entry):
+class EntryOpenUrlSubMenu(SubMenuEntry):
     def __init__(self,
                  urls: list[UrlEntry],
                  label: str = "",
@@ -349,16 +445,16 @@ class EntryOpenUrlSubMenu(Entry):
                     workspace=workspace
                 )
             )
-        Entry.__init__(self, f"[web] {label or 'Open URL'}")
+        SubMenuEntry.__init__(self, f"[web] {label or 'Open URL'}")
 
-    def execute(self) -> None:
+    def _build_menu(self, cancel: threading.Event) -> Dmenu:
         from dmenu_executor import Dmenu
 
         dmenu = Dmenu()
         dmenu.settings.prompt = f"Open URL"
         for entry in self._entries:
             dmenu.add_entry(entry)
-        dmenu.execute()
+        return dmenu
 
     @classmethod
     def from_dict(cls, data: dict) -> EntryOpenUrlSubMenu:
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from json import JSONDecodeError
+from pathlib import Path
+import fcntl
+import json
+import logging
+import os
+import tempfile
+
+from dmenu_executor.cache import cache_dir
+
+
+def default_history_path() -> Path:
+    return cache_dir() / "usage.json"
+
+
+class UsageHistory:
+    """
+    Selection counts per label, stored in one file shared by all processes
+    and kept apart per scope (the entry file).
+    """
+
+    def __init__(self, path: Path | None = None, scope: str = ""):
+        self._path = path or default_history_path()
+        self._scope = scope
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._counts: dict[str, int] = self._read().get(scope, {})
+
+    def _read(self) -> dict[str, dict[str, int]]:
+        if not self._path.is_file():
+            return {}
+        try:
+            data = json.loads(self._path.read_text())
+        except (OSError, JSONDecodeError) as error:
+            self._logger.warning(f"could not read {self._path}: {error}")
+            return {}
+        if not isinstance(data, dict):
+            self._logger.warning(f"malformed history in {self._path}, ignoring")
+            return {}
+        return {scope: {k: v for k, v in counts.items() if isinstance(v, int)}
+                for scope, counts in data.items() if isinstance(counts, dict)}
+
+    def count(self, label: str) -> int:
+        return self._counts.get(label, 0)
+
+    def record(self, label: str) -> None:
+        """
+        Increment the count for label, re-reading the file under a lock so
+        concurrent processes do not overwrite each other's counts.
+        """
+        self._counts[label] = self.count(label) + 1
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._path.with_name(f"{self._path.name}.lock"), "w") as _lock:
+                fcntl.flock(_lock, fcntl.LOCK_EX)
+                data = self._read()
+                counts = data.setdefault(self._scope, {})
+                counts[label] = counts.get(label, 0) + 1
+                _fd, _tmp = tempfile.mkstemp(dir=self._path.parent,
+                                             prefix=f"{self._path.name}.")
+                with os.fdopen(_fd, "w") as _file:
+                    _file.write(json.dumps(data, indent=4))
+                os.replace(_tmp, self._path)
+            self._counts = counts
+        except OSError as error:
+            self._logger.warning(f"could not write {self._path}: {error}")
@@ -3,45 +3,104 @@ from __future__ import annotations
 from json import JSONDecodeError
 from pathlib import Path
 import json
+import subprocess
 
 import dmenu
 
 from dmenu_executor.entry import Entry, create_entry_from_dict, EntryError
+from dmenu_executor.history import UsageHistory
+from dmenu_executor.prefetch import PrefetchScheduler
 from dmenu_executor.settings import Settings
 
 
+def dmenu_args(settings: Settings) -> list[str]:
+    args = ["dmenu"]
+    if settings.case_insensitive:
+        args.append("-i")
+    if settings.lines:
+        args.extend(["-l", str(settings.lines)])
+    if settings.prompt:
+        args.extend(["-p", settings.prompt])
+    args.extend(["-nb", settings.color_bar_background,
+                 "-nf", settings.color_selected_foreground,
+                 "-sb", settings.color_selected_background,
+                 "-sf", settings.color_selected_foreground])
+    return args
+
+
+def show_buffer(buffer: bytes | memoryview, settings: Settings) -> str | None:
+    """
+    Show dmenu with a newline separated, UTF-8 encoded label buffer written
+    as-is to its stdin. Returns the selected label, or None if cancelled.
+    """
+    proc = subprocess.Popen(dmenu_args(settings),
+                            stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE)
+    out, _ = proc.communicate(input=buffer)
+    if proc.returncode != 0:
+        return None
+    return out.decode("utf-8", "surrogateescape").rstrip("\n") or None
+
 
 class Dmenu:
-    def __init__(self, settings: Settings | None = None):
+    def __init__(self,
+                 settings: Settings | None = None,
+                 history: UsageHistory | None = None):
         self.settings = settings or Settings()
         self._dmenu = dmenu
-        self._entries: set[Entry] = set()
+        # dict keeps insertion (entry file) order for the prefetch ranking
+        self._entries: dict[Entry, None] = {}
+        self._history = history
+        self._labels: list[str] | None = None
+        self._lookup: dict[str, Entry] = {}
 
     def add_entry(self, entry: Entry) -> None:
         entry.settings = self.settings
-        self._entries.add(entry)
+        self._entries[entry] = None
+        self._labels = None
 
     def set_prompt(self, prompt_text: str) -> None:
         self.settings.prompt = prompt_text
 
+    def close(self) -> None:
+        pass
+
+    def prepare(self) -> None:
+        if self._labels is not None:
+            return
+        self._lookup = {e.text: e for e in self._entries}
+        self._labels = sorted(self._lookup)
+
     def execute(self) -> None:
         if not self._entries:
             raise ValueError("no entries added")
-        ret = self._dmenu.show(sorted({e.text for e in self._entries}),
-                               case_insensitive=self.settings.case_insensitive,
-                               background=self.settings.color_bar_background,
-                               foreground=self.settings.color_selected_foreground,
-                               background_selected=self.settings.color_selected_background,
-                               foreground_selected=self.settings.color_selected_foreground,
-                               lines=self.settings.lines,
-                               prompt=self.settings.prompt)
+        scheduler = None
+        if self._history is not None:
+            scheduler = PrefetchScheduler(self._history,
+                                          limit=self.settings.prefetch_submenus)
+            scheduler.start(self._entries)
+        entry = None
+        try:
+            self.prepare()
+            ret = self._dmenu.show(self._labels,
+                                   case_insensitive=self.settings.case_insensitive,
+                                   background=self.settings.color_bar_background,
+                                   foreground=self.settings.color_selected_foreground,
+                                   background_selected=self.settings.color_selected_background,
+                                   foreground_selected=self.settings.color_selected_foreground,
+                                   lines=self.settings.lines,
+                                   prompt=self.settings.prompt)
+            entry = self._lookup.get(ret) if ret else None
+        finally:
+            if scheduler is not None:
+                scheduler.select(entry)
         if not ret:
             return
-        for e in self._entries:
-            if e.text == ret:
-                e.execute()
-                return
-        raise RuntimeError(f"could not find entry for execution: {ret}")
+        if entry is None:
+            raise RuntimeError(f"could not find entry for execution: {ret}")
+        if self._history is not None:
+            self._history.record(ret)
+        entry.execute()
 
     @classmethod
     def create_menu_with_errors(cls, errors: list[str] | str) -> Dmenu:
@@ -64,10 +123,11 @@ class Dmenu:
         except JSONDecodeError as json_error:
             return Dmenu.create_menu_with_errors(
                 f"Failed to decode {file_path}: {json_error}")
+        history = UsageHistory(scope=str(file_path.resolve()))
         if "settings" in data:
-            menu = cls(Settings.from_dict(data["settings"]))
+            menu = cls(Settings.from_dict(data["settings"]), history=history)
         else:
-            menu = cls()
+            menu = cls(history=history)
         for entry in data["entries"]:
             try:
                 menu.add_entry(create_entry_from_dict(entry))
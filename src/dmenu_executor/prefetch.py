@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from typing import Iterable
+import concurrent.futures
+import logging
+
+from dmenu_executor.entry import Entry
+from dmenu_executor.history import UsageHistory
+
+
+class PrefetchScheduler:
+    """
+    Speculatively prepares the submenus most likely to be selected (by usage
+    history) while the root menu is shown, discarding the rest once the
+    selection is known.
+    """
+
+    def __init__(self, history: UsageHistory, limit: int = 2):
+        self._history = history
+        self._limit = limit
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self._scheduled: list[Entry] = []
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+    def start(self, entries: Iterable[Entry]) -> None:
+        _candidates = [e for e in entries if e.can_prefetch]
+        if not _candidates or self._limit <= 0:
+            return
+        # sort is stable, entries without history keep the order given
+        _candidates.sort(key=lambda e: self._history.count(e.text), reverse=True)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._limit,
+            thread_name_prefix="prefetch")
+        for entry in _candidates[:self._limit]:
+            self._logger.debug(f"prefetching: {entry.text}")
+            entry.prefetch(self._executor)
+            self._scheduled.append(entry)
+
+    def select(self, entry: Entry | None) -> None:
+        for _scheduled in self._scheduled:
+            if _scheduled is not entry:
+                self._logger.debug(f"cancelling: {_scheduled.text}")
+                _scheduled.cancel_prefetch()
+        self._scheduled = []
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
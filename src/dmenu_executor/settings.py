@@ -16,6 +16,9 @@ class Settings:
     shell: str = "bash"
     shell_command_arg: str = "-c"
     prompt: str | None = None
+    prefetch_submenus: int = 2
+    pdf_catalogue: bool = True
+    pdf_catalogue_max_age: int = 3600
 
     @property
     def terminal_shell_start_cmd(self) -> str:
@@ -32,6 +35,9 @@ class Settings:
             lines=data.get("dmenu_lines", _default.lines),
             shell=data.get("shell", _default.shell),
             shell_command_arg=data.get("shell_command_arg", _default.shell_command_arg),
+            prefetch_submenus=data.get("prefetch_submenus", _default.prefetch_submenus),
+            pdf_catalogue=data.get("pdf_catalogue", _default.pdf_catalogue),
+            pdf_catalogue_max_age=data.get("pdf_catalogue_max_age", _default.pdf_catalogue_max_age),
         )
         logging.getLogger(f"{cls.__class__.__name__}.from_dict").debug(
             f"created: {_ret}"
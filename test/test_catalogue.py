@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+from pathlib import Path
+import os
+import threading
+import time
+
+import pytest
+
+import dmenu
+
+from dmenu_executor import entry as entry_module
+from dmenu_executor.catalogue import (CatalogueError, PdfCatalogue, PdfCatalogueMenu,
+                                      catalogue_path_for)
+from dmenu_executor.entry import EntryOpenPdf, EntryOpenPdfSubMenu
+from dmenu_executor.menu import Dmenu, dmenu_args, show_buffer
+from dmenu_executor.settings import Settings
+
+
+def _labels(catalogue: PdfCatalogue) -> list[str]:
+    return [catalogue.label(i) for i in range(len(catalogue))]
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "pdf.cat"
+    PdfCatalogue.write(path, [("b.pdf | docs", "/docs/b.pdf"),
+                              ("a.pdf | docs", "/docs/a.pdf"),
+                              ("ö.pdf | docs", "/docs/ö.pdf")])
+    with PdfCatalogue(path) as catalogue:
+        assert len(catalogue) == 3
+        assert _labels(catalogue) == ["a.pdf | docs", "b.pdf | docs", "ö.pdf | docs"]
+        assert bytes(catalogue.labels_buffer()) == \
+               "a.pdf | docs\nb.pdf | docs\nö.pdf | docs\n".encode("utf-8")
+        for index, label in enumerate(_labels(catalogue)):
+            assert catalogue.find(label) == index
+        assert catalogue.pdf_path(catalogue.find("ö.pdf | docs")) == Path("/docs/ö.pdf")
+        assert catalogue.find("c.pdf | docs") is None
+        assert catalogue.find("") is None
+
+
+def test_duplicate_labels_are_unique(tmp_path):
+    path = tmp_path / "pdf.cat"
+    PdfCatalogue.write(path, [("a", "/one/a.pdf"), ("a", "/two/a.pdf")])
+    with PdfCatalogue(path) as catalogue:
+        assert _labels(catalogue) == ["a", "a (2)"]
+        assert bytes(catalogue.labels_buffer()) == b"a\na (2)\n"
+        assert {catalogue.pdf_path(catalogue.find("a")),
+                catalogue.pdf_path(catalogue.find("a (2)"))} == \
+               {Path("/one/a.pdf"), Path("/two/a.pdf")}
+
+
+def test_newline_in_label(tmp_path):
+    path = tmp_path / "pdf.cat"
+    PdfCatalogue.write(path, [("a | docs (line\nline)", "/docs/a.pdf")])
+    with PdfCatalogue(path) as catalogue:
+        assert _labels(catalogue) == ["a | docs (line line)"]
+        assert catalogue.find("a | docs (line line)") == 0
+
+
+def test_undecodable_path(tmp_path):
+    path = tmp_path / "pdf.cat"
+    name = os.fsdecode(b"\xff.pdf")
+    PdfCatalogue.write(path, [(name, f"/docs/{name}")])
+    with PdfCatalogue(path) as catalogue:
+        assert catalogue.find(name) == 0
+        assert catalogue.pdf_path(0) == Path(f"/docs/{name}")
+
+
+def test_empty(tmp_path):
+    path = tmp_path / "pdf.cat"
+    PdfCatalogue.write(path, [])
+    with PdfCatalogue(path) as catalogue:
+        assert len(catalogue) == 0
+        assert bytes(catalogue.labels_buffer()) == b""
+        assert catalogue.find("a") is None
+
+
+@pytest.mark.parametrize("data", [b"", b"DMXC", b"XXXX" + bytes(12)])
+def test_invalid_header(tmp_path, data):
+    path = tmp_path / "pdf.cat"
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        PdfCatalogue(path)
+
+
+def test_truncated_blob(tmp_path):
+    path = tmp_path / "pdf.cat"
+    PdfCatalogue.write(path, [("a", "/docs/a.pdf")])
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(CatalogueError):
+        PdfCatalogue(path)
+
+
+@pytest.fixture
+def docs(tmp_path, monkeypatch) -> Path:
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    _docs = tmp_path / "docs"
+    (_docs / "sub").mkdir(parents=True)
+    (_docs / "a.pdf").touch()
+    (_docs / "sub" / "b.pdf").touch()
+    (_docs / "sub" / "b.nfo").write_text("info\n")
+    (_docs / "notes.txt").touch()
+    return _docs
+
+
+def _scan(docs: Path) -> list[tuple[Path, str]]:
+    return list(EntryOpenPdf.scan([str(docs)]))
+
+
+def test_scan(docs):
+    assert sorted(_scan(docs)) == [(docs / "a.pdf", ""),
+                                   (docs / "sub" / "b.pdf", "info")]
+
+
+def test_scan_does_not_follow_directory_symlinks(docs):
+    (docs / "loop").symlink_to(docs)
+    assert len(_scan(docs)) == 2
+
+
+def test_scan_cancelled(docs):
+    cancel = threading.Event()
+    cancel.set()
+    assert list(EntryOpenPdf.scan([str(docs)], cancel)) == []
+
+
+def test_build_and_open_fresh(docs):
+    assert PdfCatalogue.open_fresh([str(docs)], max_age=3600) is None
+    with PdfCatalogue.build([str(docs)], _scan(docs)) as catalogue:
+        assert _labels(catalogue) == ["a.pdf | docs", "b.pdf | docs/sub (info)"]
+    with PdfCatalogue.open_fresh([str(docs)], max_age=3600) as catalogue:
+        assert catalogue.pdf_path(1) == docs / "sub" / "b.pdf"
+
+
+def test_open_fresh_ignores_old_catalogue(docs):
+    PdfCatalogue.build([str(docs)], _scan(docs)).close()
+    _past = time.time() - 60
+    os.utime(catalogue_path_for([str(docs)]), (_past, _past))
+    assert PdfCatalogue.open_fresh([str(docs)], max_age=30) is None
+
+
+def test_build_fails_on_read_only_cache(docs, monkeypatch):
+    def _fail(*args, **kwargs):
+        raise PermissionError("read-only")
+
+    monkeypatch.setattr(PdfCatalogue, "write", _fail)
+    assert PdfCatalogue.build([str(docs)], _scan(docs)) is None
+
+
+class FakePopen:
+    calls: list[tuple[list[str], bytes]] = []
+    selection = b""
+    returncode = 0
+
+    def __init__(self, args, stdin=None, stdout=None):
+        self._args = args
+
+    def communicate(self, input=None):
+        FakePopen.calls.append((self._args, bytes(input)))
+        return FakePopen.selection, None
+
+
+@pytest.fixture
+def popen(monkeypatch) -> type[FakePopen]:
+    FakePopen.calls = []
+    FakePopen.selection = b""
+    FakePopen.returncode = 0
+    monkeypatch.setattr("dmenu_executor.menu.subprocess.Popen", FakePopen)
+    return FakePopen
+
+
+@pytest.fixture
+def executed(monkeypatch) -> list[str]:
+    _executed = []
+    monkeypatch.setattr(entry_module, "run_exec", _executed.append)
+    return _executed
+
+
+def test_dmenu_args():
+    settings = Settings(prompt="Open", lines=10, color_bar_background="black",
+                        color_selected_foreground="white",
+                        color_selected_background="blue")
+    assert dmenu_args(settings) == ["dmenu", "-i", "-l", "10", "-p", "Open",
+                                    "-nb", "black", "-nf", "white",
+                                    "-sb", "blue", "-sf", "white"]
+    assert dmenu_args(Settings(case_insensitive=False, lines=0))[:2] == ["dmenu", "-nb"]
+
+
+def test_show_buffer(popen):
+    popen.selection = b"b\n"
+    assert show_buffer(b"a\nb\n", Settings()) == "b"
+    assert popen.calls == [(dmenu_args(Settings()), b"a\nb\n")]
+    popen.returncode = 1
+    assert show_buffer(b"a\nb\n", Settings()) is None
+
+
+def test_catalogue_menu_execute(docs, popen, executed):
+    catalogue = PdfCatalogue.build([str(docs)], _scan(docs))
+    popen.selection = "b.pdf | docs/sub (info)\n".encode("utf-8")
+    PdfCatalogueMenu(catalogue, executable="zathura").execute()
+    assert popen.calls[0][1] == b"a.pdf | docs\nb.pdf | docs/sub (info)\n"
+    assert executed == [f"zathura \"{docs / 'sub' / 'b.pdf'}\""]
+    assert catalogue._mm.closed
+
+
+def test_catalogue_menu_cancelled(docs, popen, executed):
+    catalogue = PdfCatalogue.build([str(docs)], _scan(docs))
+    popen.returncode = 1
+    PdfCatalogueMenu(catalogue, executable="zathura").execute()
+    assert executed == []
+    assert catalogue._mm.closed
+
+
+def test_catalogue_menu_missing_file(docs, popen, executed, monkeypatch):
+    errors = []
+    monkeypatch.setattr(dmenu, "show", lambda items, **kwargs: errors.extend(items))
+    catalogue = PdfCatalogue.build([str(docs)], _scan(docs))
+    (docs / "a.pdf").unlink()
+    popen.selection = b"a.pdf | docs\n"
+    PdfCatalogueMenu(catalogue, executable="zathura").execute()
+    assert executed == []
+    assert errors == [f"file does not exist: {docs / 'a.pdf'}"]
+    assert not catalogue_path_for([str(docs)]).exists()
+
+
+def _submenu(docs: Path, settings: Settings) -> EntryOpenPdfSubMenu:
+    submenu = EntryOpenPdfSubMenu(search_paths=[str(docs)], executable="zathura")
+    submenu.settings = settings
+    return submenu
+
+
+def test_submenu_uses_catalogue(docs):
+    menu = _submenu(docs, Settings()).get_menu()
+    assert isinstance(menu, PdfCatalogueMenu)
+    assert menu.settings.prompt == "Open in (zathura)"
+    assert catalogue_path_for([str(docs)]).is_file()
+    menu.close()
+
+
+def test_submenu_without_catalogue(docs):
+    menu = _submenu(docs, Settings(pdf_catalogue=False)).get_menu()
+    assert isinstance(menu, Dmenu)
+    assert not catalogue_path_for([str(docs)]).exists()
+
+
+def test_submenu_scans_once_when_write_fails(docs, monkeypatch):
+    scans = []
+    _scan_orig = EntryOpenPdf.scan
+
+    def _counting_scan(paths, cancel=None):
+        scans.append(paths)
+        return _scan_orig(paths, cancel)
+
+    monkeypatch.setattr(EntryOpenPdf, "scan", staticmethod(_counting_scan))
+    monkeypatch.setattr(PdfCatalogue, "build",
+                        classmethod(lambda cls, search_paths, items: None))
+    menu = _submenu(docs, Settings()).get_menu()
+    assert isinstance(menu, Dmenu)
+    assert len(scans) == 1
+    assert sorted(menu._labels) == ["a.pdf | docs", "b.pdf | docs/sub (info)"]
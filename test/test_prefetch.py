@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from dmenu_executor.entry import EntryError, SubMenuEntry
+from dmenu_executor.history import UsageHistory
+from dmenu_executor.menu import Dmenu
+from dmenu_executor.prefetch import PrefetchScheduler
+
+
+class SubMenu(SubMenuEntry):
+    def __init__(self, text: str):
+        self.built: list[Dmenu] = []
+        self.cancelled = 0
+        SubMenuEntry.__init__(self, text)
+
+    def _build_menu(self, cancel: threading.Event) -> Dmenu:
+        dmenu = Dmenu()
+        dmenu.add_entry(EntryError(f"{self.text} item"))
+        self.built.append(dmenu)
+        return dmenu
+
+    def cancel_prefetch(self) -> None:
+        self.cancelled += 1
+        SubMenuEntry.cancel_prefetch(self)
+
+
+@pytest.fixture
+def history(tmp_path) -> UsageHistory:
+    return UsageHistory(tmp_path / "usage.json")
+
+
+def test_history_record_persists(tmp_path, history):
+    history.record("a")
+    history.record("a")
+    assert UsageHistory(tmp_path / "usage.json").count("a") == 2
+
+
+def test_history_scopes_are_separate(tmp_path):
+    UsageHistory(tmp_path / "usage.json", scope="one").record("a")
+    assert UsageHistory(tmp_path / "usage.json", scope="one").count("a") == 1
+    assert UsageHistory(tmp_path / "usage.json", scope="two").count("a") == 0
+
+
+def test_history_record_keeps_concurrent_counts(tmp_path):
+    first = UsageHistory(tmp_path / "usage.json")
+    second = UsageHistory(tmp_path / "usage.json")
+    first.record("a")
+    second.record("a")
+    second.record("b")
+    assert UsageHistory(tmp_path / "usage.json").count("a") == 2
+    assert second.count("a") == 2
+
+
+def test_scheduler_prefetches_most_used(history):
+    first, second, third = SubMenu("first"), SubMenu("second"), SubMenu("third")
+    history.record("third")
+    scheduler = PrefetchScheduler(history, limit=2)
+    scheduler.start([first, second, third, EntryError("error")])
+    scheduler.select(third)
+    assert third.cancelled == 0
+    assert first.cancelled == 1
+    assert second.cancelled == 0
+    assert len(third.built) == 1
+    menu = third.get_menu()
+    assert menu is third.built[0]
+    assert len(third.built) == 1
+
+
+def test_scheduler_cancels_all_without_selection(history):
+    entries = [SubMenu("first"), SubMenu("second")]
+    scheduler = PrefetchScheduler(history, limit=2)
+    scheduler.start(entries)
+    scheduler.select(None)
+    assert [e.cancelled for e in entries] == [1, 1]
+
+
+def test_get_menu_builds_when_not_prefetched():
+    entry = SubMenu("first")
+    menu = entry.get_menu()
+    assert entry.built == [menu]
+
+
+def test_execute_cancels_prefetch_when_show_fails(history):
+    class FailingDmenu:
+        @staticmethod
+        def show(*args, **kwargs):
+            raise RuntimeError("dmenu missing")
+
+    entries = [SubMenu("first"), SubMenu("second")]
+    menu = Dmenu(history=history)
+    for entry in entries:
+        menu.add_entry(entry)
+    menu._dmenu = FailingDmenu
+    with pytest.raises(RuntimeError):
+        menu.execute()
+    assert [e.cancelled for e in entries] == [1, 1]
+
+
+def test_execute_uses_prompt_set_after_prepare():
+    class RecordingDmenu:
+        kwargs: dict = {}
+
+        @classmethod
+        def show(cls, items, **kwargs):
+            cls.kwargs = kwargs
+            return None
+
+    menu = Dmenu()
+    menu.add_entry(EntryError("error"))
+    menu.prepare()
+    menu.set_prompt("later")
+    menu._dmenu = RecordingDmenu
+    menu.execute()
+    assert RecordingDmenu.kwargs["prompt"] == "later"